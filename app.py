@@ -1,9 +1,11 @@
 # app.py
 
+import sys
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
+import pyarrow.parquet as pq
 import streamlit as st
 import plotly.express as px
 
@@ -14,26 +16,397 @@ import plotly.express as px
 PROJECT_ROOT = Path(__file__).resolve().parent
 DATA_EXPORTS = PROJECT_ROOT / "data_exports"
 
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from parquet_io import PARQUET_SPECS, convert_csv_to_parquet
+
 TRUMP_START = pd.Timestamp("2025-01-20")
 
+# Row cap for the award-level table in the Recipients tab
+DETAILS_MAX_ROWS = 1000
+
+
+# Only the columns the dashboard actually reads; everything else stays on disk.
+AWARDS_COLS = [
+    "awardid",
+    "label",
+    "awarding_agency_name",
+    "cfda_title",
+    "total_obligation_pos",
+    "total_deobligation_neg",
+    "trump_era_flag",
+]
+TX_COLS = [
+    "awardid",
+    "action_date",
+    "label",
+    "cfda_title",
+    "recipient_name",
+    "recipient_city_name",
+    "deobligated_amount_usd",
+    "trump_era_flag",
+]
+GEO_COLS = [
+    "county_name",
+    "population_total",
+    "deobligated_amount_usd",
+    "deob_dollars_per_capita",
+    "cuts_per_10k_residents",
+    "pct_minority",
+]
+CAT_COLS = [
+    "label",
+    "awarding_agency_name",
+    "cfda_title",
+    "recipient_name",
+    "recipient_city_name",
+    "county_name",
+]
+# Narrow numeric dtypes. Dollar columns stay float64: their sums reach
+# billions, well past what float32 represents to the cent.
+DOWNCAST = {
+    "trump_era_flag": "int8",
+    "population_total": "float32",
+    "deob_dollars_per_capita": "float32",
+    "cuts_per_10k_residents": "float32",
+    "pct_minority": "float32",
+}
+
+
+def parquet_is_current(parquet_path, csv_path):
+    """
+    The Parquet copy is usable only if it is at least as new as the CSV and
+    has the same columns. The CSVs are tracked in git and the Parquet files
+    are not, so a pull or ETL run can leave an older copy behind.
+    """
+    if not parquet_path.exists():
+        return False
+    if not csv_path.exists():
+        return True
+    if csv_path.stat().st_mtime > parquet_path.stat().st_mtime:
+        return False
+    csv_cols = set(pd.read_csv(csv_path, nrows=0).columns)
+    return set(pq.read_schema(parquet_path).names) == csv_cols
+
+
+def read_export(name, columns, date_cols=()):
+    """
+    Read one data_exports table, projecting to `columns`.
+    Prefers the Parquet copy written by the ETL. A missing or stale copy (see
+    parquet_is_current) is regenerated from the CSV, and the CSV is read
+    directly only when the copy can't be written.
+    """
+    parquet_path = DATA_EXPORTS / f"{name}.parquet"
+    csv_path = DATA_EXPORTS / f"{name}.csv"
+    use_parquet = parquet_is_current(parquet_path, csv_path)
+    if not use_parquet and csv_path in PARQUET_SPECS:
+        try:
+            convert_csv_to_parquet(csv_path)
+            use_parquet = True
+        except OSError:
+            pass  # e.g. read-only checkout; fall back to the CSV below
+
+    if use_parquet:
+        present = set(pq.read_schema(parquet_path).names)
+        return pd.read_parquet(
+            parquet_path,
+            columns=[c for c in columns if c in present],
+            engine="pyarrow",
+        )
+
+    present = set(pd.read_csv(csv_path, nrows=0).columns)
+    return pd.read_csv(
+        csv_path,
+        usecols=[c for c in columns if c in present],
+        parse_dates=[c for c in date_cols if c in present],
+    )
+
+
+def month_floor(s):
+    # Truncating to datetime64[M] is integer math on the int64 values, without
+    # boxing every timestamp into a Period like dt.to_period("M") does
+    return s.to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
+
 
-@st.cache_data
+# cache_resource hands every rerun the same frames; cache_data would unpickle
+# a fresh copy of all of them on each rerun. Nothing below mutates them
+# (aggregations select, group and assign into new frames), so sharing is safe.
+@st.cache_resource
 def load_data():
-    awards = pd.read_csv(
-        DATA_EXPORTS / "awards_master.csv",
-        parse_dates=["first_action_date", "last_action_date", "first_negative_date"],
+    awards = read_export("awards_master", AWARDS_COLS)
+    tx = read_export("transactions_deob", TX_COLS, date_cols=["action_date"])
+    geo = read_export("geo_aggregation", GEO_COLS)
+
+    # Low-cardinality strings become categories (group-bys and isin filters
+    # work on integer codes); flags and county ratios get narrower dtypes
+    for df in (awards, tx, geo):
+        for c in CAT_COLS:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+        for c, dtype in DOWNCAST.items():
+            if c in df.columns:
+                df[c] = df[c].astype(dtype)
+
+    # Program title per transaction. The ETL writes it into transactions_deob;
+    # for exports from before that, look it up once per load rather than on
+    # every filter change (awardid is unique in awards_master, so a
+    # Series.map attaches it without materializing a merged frame)
+    if "cfda_title" not in tx.columns and "cfda_title" in awards.columns:
+        tx["cfda_title"] = tx["awardid"].map(awards.set_index("awardid")["cfda_title"])
+
+    # Month key for every monthly chart, derived once per load instead of in
+    # each aggregation
+    if "action_date" in tx.columns:
+        tx["month"] = month_floor(tx["action_date"])
+
+    # Trump-era partitions, built once so the era toggle is a lookup, not a mask
+    if "trump_era_flag" in awards.columns:
+        awards_trump = awards[awards["trump_era_flag"].eq(1)].reset_index(drop=True)
+    else:
+        awards_trump = awards
+    if "trump_era_flag" in tx.columns:
+        tx_trump = tx[tx["trump_era_flag"].eq(1)].reset_index(drop=True)
+    else:
+        tx_trump = tx
+
+    # Sidebar options, computed once with the data rather than on every rerun.
+    # Categories are the sorted distinct values, so no column scan is needed.
+    labels = awards["label"].cat.categories.tolist()
+    agencies = awards["awarding_agency_name"].cat.categories.tolist()
+
+    return awards, awards_trump, tx, tx_trump, geo, labels, agencies
+
+
+# -------------------------------------------------------------------
+# Filtering and cached aggregations
+# -------------------------------------------------------------------
+# Each aggregation is memoized on its filter key, so reruns triggered by an
+# unrelated widget reuse the small aggregated frame instead of regrouping.
+# Frames are passed as `_`-prefixed arguments, which Streamlit does not hash;
+# they only change when load_data() does. Functions that receive an era
+# partition still take `trump` so the two partitions get separate entries.
+
+
+def filter_awards(awards, labels, agencies, columns=None):
+    # Combine all predicates, then select rows once; with `columns`, only
+    # those columns are gathered for the selected rows
+    award_mask = awards["label"].isin(labels)
+    if agencies:
+        award_mask &= awards["awarding_agency_name"].isin(agencies)
+
+    if columns is None:
+        return awards[award_mask]
+    return awards.loc[award_mask, columns]
+
+
+def top_n_index(s, n):
+    # np.argpartition selects the n largest in O(k) without sorting all k
+    # groups; callers only test membership, so the order doesn't matter
+    vals = s.to_numpy()
+    if len(vals) <= n:
+        return s.index
+    return s.index[np.argpartition(vals, -n)[-n:]]
+
+
+def with_month(tx, cols):
+    # Project to the columns the aggregation needs plus the `month` key
+    # precomputed in load_data(), so the derived frame stays narrow
+    return tx[["month", *cols]]
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_by_label(_awards, labels, agencies, trump):
+    awards_f = filter_awards(_awards, labels, agencies)
+    return (
+        awards_f.groupby("label", sort=False, observed=True)["total_deobligation_neg"]
+            .sum()
+            .reset_index()
+            .sort_values("total_deobligation_neg", ascending=False)
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_by_month(_tx, trump):
+    tx_f = with_month(_tx, ["deobligated_amount_usd"])
+    return (
+        tx_f.groupby("month", observed=True)["deobligated_amount_usd"]
+            .sum()
+            .reset_index()
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_by_month_label(_tx, trump):
+    tx_f = with_month(_tx, ["label", "deobligated_amount_usd"])
+    return (
+        tx_f.groupby(["month", "label"], observed=True)["deobligated_amount_usd"]
+            .sum()
+            .reset_index()
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_by_prog_month(_tx, _awards, labels, agencies, trump):
+    # cfda_title is already on tx (see load_data), so the filters only have to
+    # decide which awards' transactions to keep
+    awards_f = filter_awards(_awards, labels, agencies, ["awardid"])
+    tx_f = with_month(_tx, ["cfda_title", "deobligated_amount_usd"])
+    tx_join = tx_f[_tx["awardid"].isin(awards_f["awardid"])]
+
+    # Pick the top programs first so the (month, program) group-by only sees
+    # their rows
+    top_cfda = top_n_index(
+        tx_join.groupby("cfda_title", sort=False, observed=True)["deobligated_amount_usd"].sum(),
+        8,
+    )
+
+    return (
+        tx_join[tx_join["cfda_title"].isin(top_cfda)]
+            .groupby(["month", "cfda_title"], observed=True)["deobligated_amount_usd"]
+            .sum()
+            .reset_index()
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_top_recipients(_tx, trump):
+    return (
+        _tx.groupby("recipient_name", sort=False, observed=True)["deobligated_amount_usd"]
+            .sum()
+            .reset_index()
+            .sort_values("deobligated_amount_usd", ascending=False)
+            .head(20)
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_top_programs(_awards, labels, agencies, trump):
+    # Narrow the label filter to cancellations / rescissions up front, so one
+    # selection gathers just the two columns of just those awards
+    canc_labels = [label for label in labels if label in ("CANCELLATION", "RESCISSION")]
+    awards_f = filter_awards(
+        _awards, canc_labels, agencies, ["cfda_title", "total_deobligation_neg"]
+    )
+    return (
+        awards_f
+            .groupby("cfda_title", sort=False, observed=True)["total_deobligation_neg"]
+            .sum()
+            .reset_index()
+            .sort_values("total_deobligation_neg", ascending=False)
+            .head(20)
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_treemap(_awards, labels, agencies, trump, top_n=50):
+    # One leaf per (agency, program, label) instead of one per award; beyond
+    # the top_n leaves, each agency's remainder is rolled into an "Other" node
+    path = ["awarding_agency_name", "cfda_title", "label"]
+    awards_f = filter_awards(_awards, labels, agencies)
+    leaves = (
+        awards_f.groupby(path, observed=True)["total_deobligation_neg"]
+            .sum()
+            .reset_index()
+    )
+    top = leaves.nlargest(top_n, "total_deobligation_neg")
+    rest = (
+        leaves.drop(top.index)
+            .groupby("awarding_agency_name", as_index=False, observed=True)[
+                "total_deobligation_neg"
+            ]
+            .sum()
+            .assign(cfda_title="Other", label="Other")
+    )
+    # px.treemap reduces the color column with max, which unordered
+    # Categoricals reject, so the path columns go back to plain objects.
+    return pd.concat([top, rest], ignore_index=True).astype({c: object for c in path})
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_county_totals(_geo):
+    return (
+        _geo.groupby("county_name", sort=False, observed=True)["deobligated_amount_usd"]
+            .sum()
+            .reset_index()
+            .sort_values("deobligated_amount_usd", ascending=False)
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_county_rates(_geo):
+    return (
+        _geo.groupby("county_name", sort=False, observed=True)["cuts_per_10k_residents"]
+            .mean()
+            .reset_index()
+            .sort_values("cuts_per_10k_residents", ascending=False)
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_prog_era(_awards):
+    prog_full = _awards[["cfda_title", "total_deobligation_neg"]].assign(
+        era=np.where(_awards["trump_era_flag"] == 1, "Trump era", "Pre‑Trump only")
+    )
+    prog_agg = (
+        prog_full.groupby(["cfda_title", "era"], observed=True)["total_deobligation_neg"]
+            .sum()
+            .reset_index()
+    )
+    top_prog_names = top_n_index(
+        prog_agg.groupby("cfda_title", sort=False, observed=True)["total_deobligation_neg"].sum(),
+        10,
+    )
+    return prog_agg[prog_agg["cfda_title"].isin(top_prog_names)]
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_prog_size(_awards_trump):
+    return (
+        _awards_trump.groupby("cfda_title", sort=False, observed=True)[
+            ["total_obligation_pos", "total_deobligation_neg"]
+        ]
+            .sum()
+            .reset_index()
     )
 
-    tx = pd.read_csv(
-        DATA_EXPORTS / "transactions_deob.csv",
-        parse_dates=["action_date"],
+
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_city_totals(_tx):
+    return (
+        _tx.groupby("recipient_city_name", sort=False, observed=True)[
+            "deobligated_amount_usd"
+        ]
+            .sum()
+            .reset_index()
+            .sort_values("deobligated_amount_usd", ascending=False)
     )
 
-    geo = pd.read_csv(DATA_EXPORTS / "geo_aggregation.csv")
-    return awards, tx, geo
 
+@st.cache_data(ttl=3600, max_entries=64)
+def compute_city_month(_tx, cities):
+    # Restrict to the requested cities first so the group-by only hashes them
+    tx_top = _tx[_tx["recipient_city_name"].isin(cities)]
+    return (
+        with_month(tx_top, ["recipient_city_name", "deobligated_amount_usd"])
+            .groupby(["month", "recipient_city_name"], observed=True)[
+                "deobligated_amount_usd"
+            ]
+            .sum()
+            .reset_index()
+    )
 
-awards, tx, geo= load_data()
+
+(
+    awards,
+    awards_trump,
+    tx,
+    tx_trump,
+    geo,
+    available_labels,
+    available_agencies,
+) = load_data()
 
 st.set_page_config(
     page_title="MA Grant Cuts – Trump Era",
@@ -47,14 +420,12 @@ st.title("Massachusetts Federal Grant Cuts – Trump Era Dashboard")
 
 st.sidebar.header("Global filters")
 
-available_labels = sorted(awards["label"].dropna().unique())
 label_filter = st.sidebar.multiselect(
     "Award classification (label)",
     available_labels,
     default=available_labels,
 )
 
-available_agencies = sorted(awards["awarding_agency_name"].dropna().unique())
 agency_filter = st.sidebar.multiselect(
     "Awarding agency",
     available_agencies,
@@ -66,46 +437,30 @@ trump_only = st.sidebar.checkbox(
     value=True,
 )
 
-# Apply filters to awards
-awards_f = awards[awards["label"].isin(label_filter)].copy()
-if agency_filter:
-    awards_f = awards_f[awards_f["awarding_agency_name"].isin(agency_filter)]
-
-# Overview respects Trump-era toggle
-if trump_only and "trump_era_flag" in awards.columns:
-    awards_f = awards_f[awards_f["trump_era_flag"] == 1].copy()
-
-# Apply filters to transactions
-if trump_only and "trump_era_flag" in tx.columns:
-    tx_f = tx[tx["trump_era_flag"] == 1].copy()
-else:
-    tx_f = tx.copy()
-
-# Tabs (tab name changed to "City Impacts")
+# Cache keys: sorted so reordering a multiselect still hits the cache
+label_key = tuple(sorted(label_filter))
+agency_key = tuple(sorted(agency_filter))
 
+# Overview respects Trump-era toggle: pick the precomputed partition
+awards_era = awards_trump if trump_only else awards
+tx_era = tx_trump if trump_only else tx
 
-(
-    tab_overview,
-    tab_time,
-    tab_recipients,
-    tab_geo,
-    tab_programs,
-    tab_cities
-) = st.tabs(
-    [
-        "Overview",
-        "Time Trends",
-        "Recipients & Programs",
-        "Geography & Equity",
-        "Programs & Agencies",
-        "City Impacts"
-    ]
-)
+# Tab bodies are functions so only the selected one runs (see the dispatch at
+# the bottom of the file)
 
 # 1. Overview tab
 
 
-with tab_overview:
+def render_overview():
+    # Filtered rows for the KPIs and histogram, projected to the two columns
+    # they read; built here so other tabs don't pay for it on every rerun
+    awards_f = filter_awards(
+        awards_era,
+        label_filter,
+        agency_filter,
+        ["total_obligation_pos", "total_deobligation_neg"],
+    )
+
     c1, c2, c3 = st.columns(3, gap="large")
     total_deob = float(awards_f["total_deobligation_neg"].sum())
     total_pos = float(awards_f["total_obligation_pos"].sum())
@@ -119,12 +474,7 @@ with tab_overview:
         f"{deob_rate:0.2f}%" if not np.isnan(deob_rate) else "NA",
     )
 
-    by_label = (
-        awards_f.groupby("label")["total_deobligation_neg"]
-            .sum()
-            .reset_index()
-            .sort_values("total_deobligation_neg", ascending=False)
-    )
+    by_label = compute_by_label(awards_era, label_key, agency_key, trump_only)
 
     fig_label = px.bar(
         by_label,
@@ -143,15 +493,19 @@ with tab_overview:
     )
     st.plotly_chart(fig_label, key="overview_label")
 
-    cuts = awards_f["total_deobligation_neg"]
+    cuts = awards_f["total_deobligation_neg"].to_numpy()
     cuts = cuts[cuts > 0]
-    if not cuts.empty:
-        fig_hist = px.histogram(
-            cuts,
-            nbins=40,
-            labels={"value": "De‑obligated dollars per award (USD)"},
+    if cuts.size:
+        # Binned here so the figure carries 40 bars instead of one value per
+        # award for Plotly to bin in the browser
+        counts, edges = np.histogram(cuts, bins=40)
+        fig_hist = px.bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            labels={"x": "De‑obligated dollars per award (USD)", "y": "count"},
             title="Distribution of cut sizes across awards",
         )
+        fig_hist.update_traces(width=edges[1] - edges[0])
         fig_hist.update_layout(margin=dict(l=10, r=10, t=40, b=40))
         st.plotly_chart(fig_hist, key="overview_hist")
 
@@ -159,18 +513,11 @@ with tab_overview:
 # 2. Time Trends tab
 
 
-with tab_time:
+def render_time_trends():
     st.subheader("Time trends of de‑obligations")
 
-    if "action_date" in tx_f.columns:
-        tx_f["month"] = tx_f["action_date"].dt.to_period("M").dt.to_timestamp()
-
-        by_month = (
-            tx_f.groupby("month")["deobligated_amount_usd"]
-                .sum()
-                .reset_index()
-                .sort_values("month")
-        )
+    if "action_date" in tx.columns:
+        by_month = compute_by_month(tx_era, trump_only)
 
         fig_month = px.line(
             by_month,
@@ -186,12 +533,7 @@ with tab_time:
         fig_month.update_layout(margin=dict(l=10, r=10, t=40, b=40))
         st.plotly_chart(fig_month, key="time_month")
 
-        by_month_label = (
-            tx_f.groupby(["month", "label"])["deobligated_amount_usd"]
-                .sum()
-                .reset_index()
-                .sort_values("month")
-        )
+        by_month_label = compute_by_month_label(tx_era, trump_only)
 
         fig_area = px.area(
             by_month_label,
@@ -208,28 +550,11 @@ with tab_time:
         fig_area.update_layout(margin=dict(l=10, r=10, t=40, b=40))
         st.plotly_chart(fig_area, key="time_area")
 
-        tx_join = tx_f.merge(
-            awards_f[[c for c in ["awardid", "cfda_title"] if c in awards_f.columns]],
-            on="awardid",
-            how="left",
-        )
-
-        if "cfda_title" in tx_join.columns:
-            by_prog_month = (
-                tx_join.groupby(["month", "cfda_title"])["deobligated_amount_usd"]
-                    .sum()
-                    .reset_index()
+        if "cfda_title" in awards.columns:
+            by_prog_month = compute_by_prog_month(
+                tx_era, awards_era, label_key, agency_key, trump_only
             )
 
-            top_cfda = (
-                by_prog_month.groupby("cfda_title")["deobligated_amount_usd"]
-                    .sum()
-                    .nlargest(8)
-                    .index
-            )
-
-            by_prog_month = by_prog_month[by_prog_month["cfda_title"].isin(top_cfda)]
-
             fig_prog_month = px.line(
                 by_prog_month,
                 x="month",
@@ -248,16 +573,10 @@ with tab_time:
 
 # 3. Recipients & Programs tab
 
-with tab_recipients:
+def render_recipients():
     c1, c2 = st.columns(2, gap="large")
 
-    tx_rec = (
-        tx_f.groupby("recipient_name")["deobligated_amount_usd"]
-            .sum()
-            .reset_index()
-            .sort_values("deobligated_amount_usd", ascending=False)
-            .head(20)
-    )
+    tx_rec = compute_top_recipients(tx_era, trump_only)
 
     fig_rec = px.bar(
         tx_rec,
@@ -276,16 +595,8 @@ with tab_recipients:
     )
     c1.plotly_chart(fig_rec, key="recipients_top")
 
-    canc_labels = {"CANCELLATION", "RESCISSION"}
-    if "cfda_title" in awards_f.columns:
-        top_prog = (
-            awards_f[awards_f["label"].isin(canc_labels)]
-                .groupby("cfda_title")["total_deobligation_neg"]
-                .sum()
-                .reset_index()
-                .sort_values("total_deobligation_neg", ascending=False)
-                .head(20)
-        )
+    if "cfda_title" in awards.columns:
+        top_prog = compute_top_programs(awards_era, label_key, agency_key, trump_only)
 
         fig_prog = px.bar(
             top_prog,
@@ -304,16 +615,16 @@ with tab_recipients:
         )
         c2.plotly_chart(fig_prog, key="recipients_prog")
 
-    st.subheader("Award‑level table")
-    max_deob = int(awards_f["total_deobligation_neg"].max() or 0)
-    min_deob = st.slider(
-        "Minimum de‑obligated dollars per award",
-        min_value=0,
-        max_value=max_deob,
-        value=0,
-        step=max(100000, max_deob // 50 if max_deob > 0 else 100000),
-    )
+    render_award_table()
+
+
+# The slider only affects the table below it, so the table is a fragment:
+# moving the slider reruns just this function, not the charts above or the
+# rest of the script
 
+@st.fragment
+def render_award_table():
+    st.subheader("Award‑level table")
     details_cols = [
         "awardid",
         "cfda_title",
@@ -322,27 +633,54 @@ with tab_recipients:
         "total_obligation_pos",
         "total_deobligation_neg",
     ]
-    details_cols = [c for c in details_cols if c in awards_f.columns]
-    details = (
-        awards_f[awards_f["total_deobligation_neg"] >= min_deob][details_cols]
-            .sort_values("total_deobligation_neg", ascending=False)
-    )
+    details_cols = [c for c in details_cols if c in awards.columns]
+    awards_f = filter_awards(awards_era, label_filter, agency_filter, details_cols)
+
+    # One ndarray for both the slider bound and the row mask; nanmax keeps the
+    # NaN-skipping behaviour of Series.max and returns 0 for an empty selection
+    deob_arr = awards_f["total_deobligation_neg"].to_numpy()
+    max_deob = int(np.nanmax(deob_arr, initial=0))
+    if max_deob > 0:
+        min_deob = st.slider(
+            "Minimum de‑obligated dollars per award",
+            min_value=0,
+            max_value=max_deob,
+            value=0,
+            step=max(100000, max_deob // 50),
+        )
+    else:
+        # st.slider rejects min_value == max_value, e.g. when every label is
+        # deselected; there is nothing to filter, so show the table as is
+        st.info("No de‑obligated dollars in the current selection.")
+        min_deob = 0
+
+    details = awards_f.iloc[np.flatnonzero(deob_arr >= min_deob)]
+
+    # Only the largest rows are sent to the browser; the full selection can
+    # be tens of thousands of awards and is serialized on every rerun
+    if len(details) > DETAILS_MAX_ROWS:
+        st.caption(
+            f"Showing the {DETAILS_MAX_ROWS:,} largest of {len(details):,} awards; "
+            "raise the minimum to narrow the list."
+        )
+    details = details.nlargest(DETAILS_MAX_ROWS, "total_deobligation_neg")
     st.dataframe(details, height=400)
 
 
 # 4. Geography & Equity tab
 
-with tab_geo:
+def render_geography():
     st.subheader("County‑level equity view")
 
     if {"pct_minority", "deob_dollars_per_capita"}.issubset(geo.columns):
-        geo_scatter = geo.dropna(subset=["pct_minority", "deob_dollars_per_capita"]).copy()
+        geo_scatter = geo.dropna(subset=["pct_minority", "deob_dollars_per_capita"])
         fig_scatter = px.scatter(
             geo_scatter,
             x="pct_minority",
             y="deob_dollars_per_capita",
             size="population_total" if "population_total" in geo.columns else None,
             hover_name="county_name",
+            render_mode="webgl",
             labels={
                 "pct_minority": "% minority (ACS DP05)",
                 "deob_dollars_per_capita": "De‑obligated dollars per capita",
@@ -355,12 +693,7 @@ with tab_geo:
     c1, c2 = st.columns(2, gap="large")
 
     if {"county_name", "deobligated_amount_usd"}.issubset(geo.columns):
-        top_geo = (
-            geo.groupby("county_name")["deobligated_amount_usd"]
-                .sum()
-                .reset_index()
-                .sort_values("deobligated_amount_usd", ascending=False)
-        )
+        top_geo = compute_county_totals(geo)
         fig_geo_bar = px.bar(
             top_geo,
             x="deobligated_amount_usd",
@@ -379,12 +712,7 @@ with tab_geo:
         c1.plotly_chart(fig_geo_bar, key="geo_bar")
 
     if {"county_name", "cuts_per_10k_residents"}.issubset(geo.columns):
-        rate_geo = (
-            geo.groupby("county_name")["cuts_per_10k_residents"]
-                .mean()
-                .reset_index()
-                .sort_values("cuts_per_10k_residents", ascending=False)
-        )
+        rate_geo = compute_county_rates(geo)
         fig_geo_rate = px.bar(
             rate_geo,
             x="cuts_per_10k_residents",
@@ -404,13 +732,13 @@ with tab_geo:
 
 # 5. Programs & Agencies tab
 
-with tab_programs:
+def render_programs():
     st.subheader("Programs and agencies")
 
     if {"awarding_agency_name", "cfda_title", "label", "total_deobligation_neg"}.issubset(
-        awards_f.columns
+        awards.columns
     ):
-        treemap_df = awards_f.copy()
+        treemap_df = compute_treemap(awards_era, label_key, agency_key, trump_only)
         fig_treemap = px.treemap(
             treemap_df,
             path=["awarding_agency_name", "cfda_title", "label"],
@@ -422,22 +750,7 @@ with tab_programs:
         st.plotly_chart(fig_treemap, key="prog_treemap")
 
     if {"cfda_title", "total_deobligation_neg", "trump_era_flag"}.issubset(awards.columns):
-        prog_full = awards.copy()
-        prog_full["era"] = np.where(
-            prog_full["trump_era_flag"] == 1, "Trump era", "Pre‑Trump only"
-        )
-        prog_agg = (
-            prog_full.groupby(["cfda_title", "era"])["total_deobligation_neg"]
-                .sum()
-                .reset_index()
-        )
-        top_prog_names = (
-            prog_agg.groupby("cfda_title")["total_deobligation_neg"]
-                .sum()
-                .nlargest(10)
-                .index
-        )
-        prog_agg = prog_agg[prog_agg["cfda_title"].isin(top_prog_names)]
+        prog_agg = compute_prog_era(awards)
 
         fig_prog_era = px.bar(
             prog_agg,
@@ -463,14 +776,7 @@ with tab_programs:
     if {"cfda_title", "total_obligation_pos", "total_deobligation_neg", "trump_era_flag"}.issubset(
         awards.columns
     ):
-        prog_trump = awards[awards["trump_era_flag"] == 1].copy()
-        prog_size = (
-            prog_trump.groupby("cfda_title")[
-                ["total_obligation_pos", "total_deobligation_neg"]
-            ]
-                .sum()
-                .reset_index()
-        )
+        prog_size = compute_prog_size(awards_trump)
 
         fig_prog_scatter = px.scatter(
             prog_size,
@@ -479,6 +785,7 @@ with tab_programs:
             color="total_deobligation_neg",
             size="total_deobligation_neg",
             hover_name="cfda_title",
+            render_mode="webgl",
             labels={
                 "total_obligation_pos": "Trump‑era obligations (USD)",
                 "total_deobligation_neg": "Trump‑era de‑obligated dollars (USD)",
@@ -494,26 +801,21 @@ with tab_programs:
 
 # 6. City Impacts tab (first and last visuals use top 10 cities)
 
-with tab_cities:
+def render_cities():
     st.subheader("City impacts")
 
     if "action_date" in tx.columns and "recipient_city_name" in tx.columns:
-        tx_full = tx.copy()
-        tx_full["month"] = tx_full["action_date"].dt.to_period("M").dt.to_timestamp()
-
         # Top 10 affected cities by total de-obligations
-        city_totals_all = (
-            tx_full.groupby("recipient_city_name")["deobligated_amount_usd"]
-                .sum()
-                .reset_index()
-                .sort_values("deobligated_amount_usd", ascending=False)
-        )
+        city_totals_all = compute_city_totals(tx)
         top10_cities = city_totals_all["recipient_city_name"].dropna().head(10).tolist()
 
+        # Monthly totals for the top 10, shared by the small multiples and the
+        # heatmap so each line gets one point per month, not one per transaction
+        city_month_top = compute_city_month(tx, tuple(top10_cities))
+
         # Small multiples for top 10
-        sm_df = tx_full[tx_full["recipient_city_name"].isin(top10_cities)].copy()
         fig_cities_ts = px.line(
-            sm_df,
+            city_month_top,
             x="month",
             y="deobligated_amount_usd",
             color="recipient_city_name",
@@ -533,15 +835,6 @@ with tab_cities:
         st.plotly_chart(fig_cities_ts, key="cities_small_multiples")
 
         # Timeline heatmap for same top 10
-        city_month = (
-            tx_full.groupby(["month", "recipient_city_name"])[
-                "deobligated_amount_usd"
-            ]
-                .sum()
-                .reset_index()
-        )
-        city_month_top = city_month[city_month["recipient_city_name"].isin(top10_cities)]
-
         fig_heat = px.density_heatmap(
             city_month_top,
             x="month",
@@ -558,3 +851,24 @@ with tab_cities:
         fig_heat.update_layout(margin=dict(l=10, r=10, t=40, b=40))
         st.plotly_chart(fig_heat, key="cities_heatmap")
 
+
+# Tabs (tab name changed to "City Impacts")
+# on_change="rerun" makes st.tabs track the selected tab in
+# st.session_state["active_tab"]; only that tab's render function runs, instead
+# of every tab's group-bys and figures on each rerun
+
+TABS = {
+    "Overview": render_overview,
+    "Time Trends": render_time_trends,
+    "Recipients & Programs": render_recipients,
+    "Geography & Equity": render_geography,
+    "Programs & Agencies": render_programs,
+    "City Impacts": render_cities,
+}
+
+for tab, render in zip(
+    st.tabs(list(TABS), key="active_tab", on_change="rerun"), TABS.values()
+):
+    if tab.open:
+        with tab:
+            render()
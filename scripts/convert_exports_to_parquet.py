@@ -0,0 +1,23 @@
+from pathlib import Path
+import sys
+
+# Ensure src is on path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from parquet_io import PARQUET_SPECS, convert_csv_to_parquet
+
+
+def main():
+    for csv_path in PARQUET_SPECS:
+        if not csv_path.exists():
+            print(f"Skipping {csv_path.name} (run run_all_exports.py first)")
+            continue
+        parquet_path = convert_csv_to_parquet(csv_path)
+        print(f"Wrote {parquet_path.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,12 +23,15 @@ def main():
     print("Exporting awards_master...")
     awards_master = export_awards_master(df, m1, date_col)
 
+    # Negative-obligation rows, shared by the transaction and geo exports
+    neg_mask = df["federal_action_obligation"].to_numpy() < 0
+
     print("Exporting transactions_deob...")
-    tx_deob = export_transactions_deob(df, m1, date_col)
+    tx_deob = export_transactions_deob(df, m1, date_col, neg_mask=neg_mask)
 
 
     print("Exporting geo_aggregation...")
-    geo = export_geo_aggregation(df, awards_master, county_lookup=None)
+    geo = export_geo_aggregation(df, awards_master, county_lookup=None, neg_mask=neg_mask)
     print(f"geo_aggregation rows: {len(geo)}")
     print("Done.")
     print(f"awards_master rows: {len(awards_master)}")
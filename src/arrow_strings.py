@@ -0,0 +1,19 @@
+import pandas as pd
+import pyarrow as pa
+
+# pandas 3 (or pandas 2 with future.infer_string) already backs str columns
+# with Arrow, where .str.strip() is Arrow's trim kernel; object-backed str
+# (pandas 2 default) goes through a Python loop instead
+_STR_IS_ARROW = getattr(pd.Series([""]).astype(str).dtype, "storage", None) == "pyarrow"
+
+
+def strip_strings(s):
+    """
+    Same result as s.astype(str).str.strip(), with the trim run by Arrow's
+    utf8_trim_whitespace kernel. Only object-backed strings take the detour
+    through an ArrowDtype Series; Arrow-backed ones are stripped directly.
+    """
+    if _STR_IS_ARROW:
+        return s.astype(str).str.strip()
+    trimmed = s.astype(str).astype(pd.ArrowDtype(pa.string())).str.strip()
+    return trimmed.astype(str)
@@ -19,6 +19,14 @@ TX_DEOB_CSV = DATA_EXPORTS / "transactions_deob.csv"
 GEO_AGG_CSV = DATA_EXPORTS / "geo_aggregation.csv"
 TX_DEOB_CITY_MONTH_CSV = DATA_EXPORTS / "transactions_deob_city_month.csv"
 
+# Parquet copies of the exports, read by app.py when present
+AWARDS_MASTER_PARQUET = AWARDS_MASTER_CSV.with_suffix(".parquet")
+TX_DEOB_PARQUET = TX_DEOB_CSV.with_suffix(".parquet")
+GEO_AGG_PARQUET = GEO_AGG_CSV.with_suffix(".parquet")
+
+# Intermediate caches
+DP05_COUNTY_PARQUET = DATA_INTERMEDIATE / "dp05_county.parquet"
+
 # Analysis constants
 TRUMP_START = pd.Timestamp("2025-01-20")  # your current Trump-era start
 
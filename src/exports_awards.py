@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
-from config import TRUMP_START, AWARDS_MASTER_CSV, ensure_directories
+from config import TRUMP_START, AWARDS_MASTER_CSV, AWARDS_MASTER_PARQUET, ensure_directories
+from parquet_io import write_parquet
 
 
-def export_awards_master(df):
+def export_awards_master(df: pd.DataFrame, m1: pd.DataFrame, datecol: str) -> pd.DataFrame:
     """
     We build awards_master.csv: one row per awardid, combining:
     - m1 (final_cum_obligation, total_negative_amount, total_obligation_amount, etc.)
@@ -13,11 +15,10 @@ def export_awards_master(df):
 
     ensure_directories()
 
-    # HARD CAST to numeric here to avoid any stray string dtype
-    df = df.copy()
-    df["federal_action_obligation"] = pd.to_numeric(
-        df["federal_action_obligation"], errors="coerce"
-    ).fillna(0.0)
+    # convert_dates_and_amounts already made this numeric; df is only read
+    # below, so neither a copy nor a second conversion pass is needed
+    if not pd.api.types.is_numeric_dtype(df["federal_action_obligation"]):
+        raise TypeError("federal_action_obligation must be numeric; run convert_dates_and_amounts first.")
 
     # Descriptive columns from the transaction-level df (must match eda_final)
     desc_cols = [
@@ -29,65 +30,41 @@ def export_awards_master(df):
     ]
     desc_present = [c for c in desc_cols if c in df.columns]
 
-    # One row per awardid with descriptive info
-    base_info = (
-        df.groupby("awardid", as_index=False)[desc_present]
-        .first()
-    )
-
-    # We start from m1 (final snapshots + labels) and add descriptive info
-    awards = m1.merge(base_info, on="awardid", how="left")
-
-    # First / last action dates per awardid (using the passed datecol, i.e. "action_date")
-    date_aggs = (
-        df.groupby("awardid", as_index=False)[datecol]
-          .agg(["min", "max"])
-    )
-    date_aggs = date_aggs.rename(
-        columns={"min": "first_action_date", "max": "last_action_date"}
+    # One group-by for every per-award figure: descriptive info (first
+    # non-null), first / last action dates (using the passed datecol, i.e.
+    # "action_date"), Trump-era cuts, and totals using federal_action_obligation
+    # (as in eda_final). Positive / negative amounts and the Trump-era cut
+    # marker are plain columns first, so every aggregation is a built-in
+    # reduction rather than a lambda.
+    amounts = df["federal_action_obligation"].to_numpy()
+    per_award = (
+        df.assign(
+            trump_cut=df["is_deobligation_tx"] & (df[datecol] >= TRUMP_START),
+            pos_amt=np.where(amounts > 0, amounts, 0.0),
+            neg_amt=np.where(amounts < 0, -amounts, 0.0),
+        )
+        .groupby("awardid", observed=True)
+        .agg(
+            **{c: (c, "first") for c in desc_present},
+            first_action_date=(datecol, "min"),
+            last_action_date=(datecol, "max"),
+            awards_with_trump_cut=("trump_cut", "any"),
+            total_obligation_pos=("pos_amt", "sum"),
+            total_deobligation_neg=("neg_amt", "sum"),
+        )
+        .reset_index()
     )
+    per_award["awards_with_trump_cut"] = per_award["awards_with_trump_cut"].astype(int)
 
-    awards = awards.merge(date_aggs, on="awardid", how="left")
+    # We start from m1 (final snapshots + labels) and add the per-award info.
+    # Both are grouped from df["awardid"], so they share its categorical
+    # dtype and the merge joins on category codes.
+    awards = m1.merge(per_award, on="awardid", how="left")
 
     # Period flags
     awards["pre_trump_flag"] = (awards["first_action_date"] < TRUMP_START).astype(int)
     awards["trump_era_flag"] = (awards["last_action_date"] >= TRUMP_START).astype(int)
 
-    # Awards with any Trump-era negative transaction
-    df_trump = df[df[datecol] >= TRUMP_START].copy()
-
-    awards_any_trump_cut = (
-        df_trump.loc[df_trump["is_deobligation_tx"]]
-        .groupby("awardid")["is_deobligation_tx"]
-        .any()
-        .astype(int)
-        .rename("awards_with_trump_cut")
-        .reset_index()
-    )
-
-    awards = awards.merge(awards_any_trump_cut, on="awardid", how="left")
-    awards["awards_with_trump_cut"] = awards["awards_with_trump_cut"].fillna(0).astype(int)
-
-    # Totals by award using federal_action_obligation (as in eda_final)
-    pos_by_award = (
-        df["federal_action_obligation"].clip(lower=0)
-        .groupby(df["awardid"]).sum()
-        .rename("total_obligation_pos")
-        .reset_index()
-    )
-
-    neg_series = df["federal_action_obligation"].clip(upper=0)
-    
-    neg_by_award = (
-    neg_series.groupby(df["awardid"]).sum()
-    .abs()
-    .rename("total_deobligation_neg")
-    .reset_index()
-    )
-
-    awards = awards.merge(pos_by_award, on="awardid", how="left")
-    awards = awards.merge(neg_by_award, on="awardid", how="left")
-
     # De-duplicate just in case
     awards = awards.drop_duplicates(subset=["awardid"])
 
@@ -117,6 +94,7 @@ def export_awards_master(df):
     out_present = [c for c in out_cols if c in awards.columns]
 
     awards[out_present].to_csv(AWARDS_MASTER_CSV, index=False)
+    write_parquet(awards[out_present], AWARDS_MASTER_PARQUET)
 
     return awards[out_present]
 
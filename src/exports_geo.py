@@ -1,18 +1,79 @@
+import numpy as np
 import pandas as pd
-from config import ACS_DP05_CSV, GEO_AGG_CSV, ensure_directories
+from config import (
+    ACS_DP05_CSV,
+    DP05_COUNTY_PARQUET,
+    GEO_AGG_CSV,
+    GEO_AGG_PARQUET,
+    ensure_directories,
+)
+from arrow_strings import strip_strings
+from parquet_io import write_parquet
+
+# DP05 columns load_dp05_county reads (both spellings of the geography
+# columns); the file has ~380 columns and only these are parsed
+DP05_COLUMNS = [
+    "GEO_ID",
+    "GEOID",
+    "NAME",
+    "Geographic Area Name",
+    "DP05_0001E",  # Total population
+    "DP05_0037E",  # Not Hispanic or Latino, White alone
+    "DP05_0038E",  # One race: Black or African American
+    "DP05_0047E",  # One race: Asian
+    "DP05_0076E",  # Hispanic or Latino (of any race)
+]
+
+# Columns of the county lookup (and of its Parquet cache)
+DP05_COUNTY_COLS = [
+    "county_fips",
+    "county_name",
+    "recipient_county_name",
+    "population_total",
+    "pct_minority",
+    "pct_black",
+    "pct_hispanic",
+    "pct_asian",
+]
 
 
 def load_dp05_county() -> pd.DataFrame:
+    """
+    County-level demographic lookup from build_dp05_county(), cached as
+    Parquet in data_intermediate. The cache is rebuilt when the DP05 file is
+    newer than it or its columns no longer match DP05_COUNTY_COLS.
+    """
+    if (
+        DP05_COUNTY_PARQUET.exists()
+        and DP05_COUNTY_PARQUET.stat().st_mtime >= ACS_DP05_CSV.stat().st_mtime
+    ):
+        cached = pd.read_parquet(DP05_COUNTY_PARQUET)
+        if list(cached.columns) == DP05_COUNTY_COLS:
+            return cached
+
+    out = build_dp05_county()
+    ensure_directories()
+    out.to_parquet(DP05_COUNTY_PARQUET, index=False, compression="zstd")
+    return out
+
+
+def build_dp05_county() -> pd.DataFrame:
     """
     Load ACS DP05 and build a county-level demographic lookup with:
     - county_fips (5-digit, derived from GEO_ID/GEOID)
     - county_name (already matching recipient_county_name)
+    - recipient_county_name (county_name under the transaction key's name)
     - population_total
     - pct_minority, pct_black, pct_hispanic, pct_asian
     """
 
     # DP05 file is actually TAB-delimited even though it has .csv extension
-    dp = pd.read_csv(ACS_DP05_CSV, sep="\t", low_memory=False)
+    dp = pd.read_csv(
+        ACS_DP05_CSV,
+        sep="\t",
+        low_memory=False,
+        usecols=lambda c: c.strip() in DP05_COLUMNS,
+    )
     dp.columns = [c.strip() for c in dp.columns]
 
     # Geography columns
@@ -36,7 +97,8 @@ def load_dp05_county() -> pd.DataFrame:
 
     # Derive 5-digit county FIPS from GEO_ID like "0500000US25001"
     out["county_fips"] = out[geo_col].astype(str).str[-5:]
-    out["county_name"] = out[name_col].astype(str).str.strip()
+    out["county_name"] = strip_strings(out[name_col])
+    out["recipient_county_name"] = out["county_name"]
 
     # Population total
     pop_col = "DP05_0001E"
@@ -48,35 +110,29 @@ def load_dp05_county() -> pd.DataFrame:
     hisp_col = "DP05_0076E"          # Hispanic or Latino (of any race) (count)
     white_not_hisp_col = "DP05_0037E"  # Not Hispanic or Latino, White alone (count)
 
-    out["pct_black"] = (
-        pd.to_numeric(dp[black_col], errors="coerce") / out["population_total"] * 100
-    )
-    out["pct_asian"] = (
-        pd.to_numeric(dp[asian_col], errors="coerce") / out["population_total"] * 100
-    )
-    out["pct_hispanic"] = (
-        pd.to_numeric(dp[hisp_col], errors="coerce") / out["population_total"] * 100
-    )
-    out["pct_minority"] = 100 - (
-        pd.to_numeric(dp[white_not_hisp_col], errors="coerce") / out["population_total"] * 100
-    )
+    # All four shares in one (rows x 4) division by the population column
+    counts = np.column_stack([
+        pd.to_numeric(dp[c], errors="coerce").to_numpy(dtype="float64")
+        for c in (black_col, asian_col, hisp_col, white_not_hisp_col)
+    ])
+    pop = out["population_total"].to_numpy(dtype="float64")
+    pct = counts / pop[:, None] * 100
 
-    return out[[
-        "county_fips",
-        "county_name",
-        "population_total",
-        "pct_minority",
-        "pct_black",
-        "pct_hispanic",
-        "pct_asian",
-    ]]
+    out["pct_black"] = pct[:, 0]
+    out["pct_asian"] = pct[:, 1]
+    out["pct_hispanic"] = pct[:, 2]
+    out["pct_minority"] = 100 - pct[:, 3]
 
+    return out[DP05_COUNTY_COLS]
 
-def export_geo_aggregation(df,awards_master,county_lookup):
+
+def export_geo_aggregation(df,awards_master,county_lookup,neg_mask=None):
     """
     We build geo_aggregation.csv at county level by joining:
     - Transaction-level deobligations summed by recipient_county_name
     - DP05 county demographics keyed by county_name (already aligned)
+    neg_mask (bool array, obligation < 0) can be passed in by a caller that
+    already computed it.
     """
 
     ensure_directories()
@@ -88,48 +144,57 @@ def export_geo_aggregation(df,awards_master,county_lookup):
     if county_col not in df.columns:
         raise KeyError(f"df must have '{county_col}' for geo aggregation.")
 
-    df = df.copy()
-    df["recipient_county_name"] = df[county_col].astype(str).str.strip()
-
-    # Negative transactions for dollars by county name
-    df_neg = df[df["federal_action_obligation"] < 0].copy()
-    df_neg["deobligated_amount_usd"] = -df_neg["federal_action_obligation"]
-
-    dollars_by_county = (
-        df_neg.groupby("recipient_county_name")["deobligated_amount_usd"]
-        .sum()
-        .reset_index()
+    # Negative transactions for dollars by county name; only the two columns
+    # the group-by needs are gathered (df itself is never copied), and county
+    # names are stripped on those rows alone
+    if neg_mask is None:
+        neg_mask = df["federal_action_obligation"].to_numpy() < 0
+    df_neg = df.loc[neg_mask, [county_col, "awardid"]]
+    df_neg[county_col] = strip_strings(df_neg[county_col])
+    df_neg["deobligated_amount_usd"] = np.negative(
+        df["federal_action_obligation"].to_numpy()[neg_mask]
     )
-
-    awards_with_cut_by_county = (
-        df_neg.groupby(["recipient_county_name", "awardid"])["deobligated_amount_usd"]
-        .sum()
+    # Group on integer category codes rather than hashing strings
+    df_neg["recipient_county_name"] = df_neg["recipient_county_name"].astype("category")
+
+    # Dollars and distinct awards with a cut per county in one group-by
+    geo = (
+        df_neg.groupby("recipient_county_name", observed=True)
+        .agg(
+            deobligated_amount_usd=("deobligated_amount_usd", "sum"),
+            awards_with_any_cut=("awardid", "nunique"),
+        )
         .reset_index()
-        .groupby("recipient_county_name")["awardid"]
-        .nunique()
-        .reset_index(name="awards_with_any_cut")
     )
-
-    geo = dollars_by_county.merge(
-        awards_with_cut_by_county, on="recipient_county_name", how="outer"
-    ).fillna({"awards_with_any_cut": 0})
-
-    # Join directly on county_name == recipient_county_name
-    county_lookup = county_lookup.copy()
-    county_lookup["recipient_county_name"] = county_lookup["county_name"].astype(str).str.strip()
+    # Back to plain strings for the join with the DP05 lookup
+    geo["recipient_county_name"] = geo["recipient_county_name"].astype(str)
+
+    # Join directly on county_name == recipient_county_name. Only the DP05
+    # columns are carried over, and validate="m:1" raises if the lookup ever
+    # has duplicate county names instead of silently multiplying rows
+    lookup_cols = [c for c in DP05_COUNTY_COLS if c in county_lookup.columns]
+    county_lookup = county_lookup[lookup_cols]
+    if "recipient_county_name" not in county_lookup.columns:
+        # Lookup built elsewhere without the join key: derive it here
+        county_lookup = county_lookup.assign(
+            recipient_county_name=strip_strings(county_lookup["county_name"])
+        )
 
     geo = geo.merge(
         county_lookup,
         on="recipient_county_name",
         how="left",
+        validate="m:1",
     )
 
-    geo["deob_dollars_per_capita"] = (
-        geo["deobligated_amount_usd"] / geo["population_total"]
-    )
-    geo["cuts_per_10k_residents"] = (
-        geo["awards_with_any_cut"] / geo["population_total"] * 10000
-    )
+    # Both rates in one (rows x 2) division by the population column
+    per_capita = np.column_stack([
+        geo["deobligated_amount_usd"].to_numpy(dtype="float64"),
+        geo["awards_with_any_cut"].to_numpy(dtype="float64"),
+    ]) / geo["population_total"].to_numpy(dtype="float64")[:, None]
+
+    geo["deob_dollars_per_capita"] = per_capita[:, 0]
+    geo["cuts_per_10k_residents"] = per_capita[:, 1] * 10000
 
     out_cols = [
         "county_fips",
@@ -147,6 +212,8 @@ def export_geo_aggregation(df,awards_master,county_lookup):
     ]
     out_present = [c for c in out_cols if c in geo.columns]
 
+    # 14 rows: to_csv keeps the same CSV dialect as awards_master.csv
     geo[out_present].to_csv(GEO_AGG_CSV, index=False)
+    write_parquet(geo[out_present], GEO_AGG_PARQUET)
 
     return geo[out_present]
@@ -1,29 +1,29 @@
+import numpy as np
 import pandas as pd
 
 from config import (
     TRUMP_START,
     TX_DEOB_CSV,
     TX_DEOB_CITY_MONTH_CSV,
+    TX_DEOB_PARQUET,
     ensure_directories,
 )
+from arrow_strings import strip_strings
+from parquet_io import write_csv, write_parquet
 
 
-def export_transactions_deob(df, m1, datecol):
+def export_transactions_deob(df, m1, datecol, neg_mask=None):
     """
     We export transaction-level de-obligations for Tableau (transactions_deob.csv)
     and a city-month rollup for animated city maps (transactions_deob_city_month.csv).
+    neg_mask (bool array, obligation < 0) can be passed in by a caller that
+    already computed it.
     """
     ensure_directories()
 
-    # 1) Base de-obligation transactions
-    df_neg = df[df["federal_action_obligation"] < 0].copy()
-    df_neg["deobligated_amount_usd"] = -df_neg["federal_action_obligation"]
-
-    label_map = m1.set_index("awardid")["label"]
-    df_neg["label"] = df_neg["awardid"].map(label_map)
-
-    df_neg[datecol] = pd.to_datetime(df_neg[datecol], errors="coerce")
-    df_neg["trump_era_flag"] = (df_neg[datecol] >= TRUMP_START).astype(int)
+    # convert_dates_and_amounts already parsed the dates; they are not re-parsed here
+    if not pd.api.types.is_datetime64_any_dtype(df[datecol]):
+        raise TypeError(f"{datecol} must be datetime64; run convert_dates_and_amounts first.")
 
     out_cols = [
         "awardid",
@@ -31,6 +31,7 @@ def export_transactions_deob(df, m1, datecol):
         "federal_action_obligation",
         "deobligated_amount_usd",
         "label",
+        "cfda_title",
         "action_type_code",
         "action_type_description",
         "correction_delete_indicator_code",
@@ -42,26 +43,65 @@ def export_transactions_deob(df, m1, datecol):
         "primary_place_of_performance_state_code",
         "trump_era_flag",
     ]
+    # Columns derived below rather than copied from df
+    derived_cols = {"deobligated_amount_usd", "label", "cfda_title", "trump_era_flag"}
+
+    # 1) Base de-obligation transactions: one .loc gathers only the columns
+    # the export carries, instead of copying every column of df
+    if neg_mask is None:
+        neg_mask = df["federal_action_obligation"].to_numpy() < 0
+    src_cols = [c for c in out_cols if c in df.columns and c not in derived_cols]
+    df_neg = df.loc[neg_mask, src_cols]
+    df_neg["deobligated_amount_usd"] = np.negative(
+        df_neg["federal_action_obligation"].to_numpy()
+    )
+
+    # Label lookup as a take: encode awardid against m1's (unique) awardids,
+    # then index m1's labels by code; codes of -1 (no award row) become NA
+    label_codes = pd.Categorical(df_neg["awardid"], categories=m1["awardid"]).codes
+    df_neg["label"] = m1["label"].array.take(label_codes, allow_fill=True)
+
+    # Award-level program (first non-null per award, as in awards_master), so
+    # the dashboard can group transactions by program without joining awards
+    if "cfda_title" in df.columns:
+        program_map = df.groupby("awardid", observed=True)["cfda_title"].first()
+        df_neg["cfda_title"] = df_neg["awardid"].map(program_map)
+
+    # 0/1 flag as uint8 (NaT compares False, so undated rows get 0)
+    df_neg["trump_era_flag"] = np.greater_equal(
+        df_neg[datecol].to_numpy(), TRUMP_START.to_datetime64()
+    ).astype(np.uint8)
+
     out_present = [c for c in out_cols if c in df_neg.columns]
 
-    df_neg[out_present].to_csv(TX_DEOB_CSV, index=False)
+    write_csv(
+        df_neg[out_present],
+        TX_DEOB_CSV,
+        money_cols=("federal_action_obligation", "deobligated_amount_usd"),
+    )
+    write_parquet(df_neg[out_present], TX_DEOB_PARQUET, sort_by=datecol)
 
     # 2) City–month rollup for animated map
     if "recipient_city_name" in df_neg.columns and "recipient_state_code" in df_neg.columns:
         df_city = df_neg.copy()
-        df_city["recipient_city_name"] = df_city["recipient_city_name"].astype(str).str.strip()
-        df_city["recipient_state_code"] = df_city["recipient_state_code"].astype(str).str.strip()
+        df_city["recipient_city_name"] = strip_strings(df_city["recipient_city_name"])
+        df_city["recipient_state_code"] = strip_strings(df_city["recipient_state_code"])
+        # Group on integer category codes rather than hashing strings
+        df_city["recipient_city_name"] = df_city["recipient_city_name"].astype("category")
+        df_city["recipient_state_code"] = df_city["recipient_state_code"].astype("category")
 
-        df_city["month"] = df_city[datecol].dt.to_period("M").dt.to_timestamp()
+        # Month floor as a datetime64[M] cast (integer math), with no Period objects
+        df_city["month"] = df_city[datecol].to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
 
         city_month = (
             df_city.groupby(
                 ["month", "recipient_city_name", "recipient_state_code", "trump_era_flag"],
                 as_index=False,
+                observed=True,
             )["deobligated_amount_usd"]
             .sum()
         )
 
-        city_month.to_csv(TX_DEOB_CITY_MONTH_CSV, index=False)
+        write_csv(city_month, TX_DEOB_CITY_MONTH_CSV, money_cols=("deobligated_amount_usd",))
 
     return df_neg[out_present]
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from config import AWARDS_MASTER_CSV, TX_DEOB_CSV, GEO_AGG_CSV
+
+# CSV export -> (date columns to parse so Parquet stores native timestamps,
+#                date column to sort by and cut month-sized row groups on)
+PARQUET_SPECS = {
+    AWARDS_MASTER_CSV: (["first_negative_date", "first_action_date", "last_action_date"], None),
+    TX_DEOB_CSV: (["action_date"], "action_date"),
+    GEO_AGG_CSV: ([], None),
+}
+
+
+def write_parquet(df, parquet_path, sort_by=None):
+    """
+    Write an export table as Parquet (zstd, 200k-row row groups by default).
+    With sort_by, rows are ordered by that date and each calendar month is
+    written as its own row group (undated rows last, in one group), so
+    row-group statistics can prune by month.
+    Category columns are written as plain values: pyarrow would otherwise
+    store the full category list (e.g. every awardid) in each row group.
+    """
+    cat_cols = df.select_dtypes("category").columns
+    if len(cat_cols):
+        df = df.astype({c: df[c].cat.categories.dtype for c in cat_cols})
+
+    if sort_by is None or sort_by not in df.columns:
+        df.to_parquet(
+            parquet_path,
+            engine="pyarrow",
+            compression="zstd",
+            row_group_size=200_000,
+            index=False,
+        )
+        return parquet_path
+
+    df = df.sort_values(sort_by, kind="mergesort", ignore_index=True)
+    # Month starts as int64, so NaT rows (sorted last) share one value and
+    # form a single trailing group
+    months = df[sort_by].to_numpy().astype("datetime64[M]").view("i8")
+    bounds = [0, *(np.flatnonzero(np.diff(months)) + 1)]
+    if len(df):
+        bounds.append(len(df))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(parquet_path, table.schema, compression="zstd") as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start))
+    return parquet_path
+
+
+def write_csv(df, csv_path, batch_rows=100_000, money_cols=()):
+    """
+    Write an export table as CSV with Arrow's C++ writer. The frame is
+    converted batch_rows rows at a time, so only one slice exists as Arrow
+    data at once. Category columns are written as their values and
+    all-midnight timestamps as plain dates, as DataFrame.to_csv does.
+    Unlike to_csv, the header and every string field are quoted, and other
+    floats use Arrow's formatting: whole numbers drop the trailing ".0" and
+    large values use exponent notation (1.26e+10). Dollar columns listed in
+    money_cols are written as decimal128(18, 2), i.e. rounded to the cent
+    with two fixed decimals (-6881.00) and never in exponent form.
+    """
+    # Output schema from the whole frame (types only), so every slice is cast
+    # to the same types even if e.g. a slice's object column is all null
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        t = field.type
+        if pa.types.is_dictionary(t):
+            t = t.value_type
+        if pa.types.is_timestamp(t):
+            values = df[field.name].to_numpy()
+            if (np.isnat(values) | (values == values.astype("datetime64[D]"))).all():
+                t = pa.date32()
+        if field.name in money_cols:
+            t = pa.decimal128(18, 2)
+        fields.append(pa.field(field.name, t))
+    schema = pa.schema(fields)
+
+    write_options = pv.WriteOptions(include_header=True, quoting_style="needed")
+    with pv.CSVWriter(csv_path, schema, write_options=write_options) as writer:
+        for start in range(0, len(df), batch_rows):
+            # A Table, not a RecordBatch: pandas' Arrow-backed string columns
+            # may already be chunked
+            chunk = pa.Table.from_pandas(df.iloc[start:start + batch_rows], preserve_index=False)
+            writer.write_table(chunk.cast(schema))
+    return csv_path
+
+
+def convert_csv_to_parquet(csv_path):
+    """
+    Write the sibling .parquet file for a data_exports CSV listed in
+    PARQUET_SPECS, for exports produced before the ETL wrote Parquet itself.
+    """
+    date_cols, sort_by = PARQUET_SPECS[csv_path]
+    df = pd.read_csv(csv_path, low_memory=False)
+    for c in date_cols:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+
+    return write_parquet(df, csv_path.with_suffix(".parquet"), sort_by=sort_by)
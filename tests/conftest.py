@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from config import USASPENDING_CSV
+from base_etl import build_base
+
+
+@pytest.fixture(scope="session")
+def base():
+    """(df, m1, datecol) from build_base, parsed once for the whole session."""
+    return build_base(str(USASPENDING_CSV))